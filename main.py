@@ -1,22 +1,76 @@
 import asyncio
+import contextlib
 import datetime
 import json
 import logging
+import os
 import pathlib
 import re
+import threading
 import time
 import warnings
 from configparser import ConfigParser
 
-import aiofiles
 import aiohttp
 import ffmpeg
 from psaw import PushshiftAPI
-from tqdm import tqdm, trange
+from tqdm import tqdm
 from tqdm.asyncio import tqdm as async_tqdm
 
+try:
+    import uvloop
+except ImportError:
+    # uvloop doesn't work on Windows, so we'll use asyncio's default event loop there.
+    uvloop = None
+
 from utils import retry_connection, get_logger
 
+_EXT_RE = re.compile(r'\.(jpe?g|gif?v|png|mp4)')
+_MP4_META_RE = re.compile(rb'content="(.+mp4)')
+_AUDIO_RE = re.compile(r'DASH_(\d{3,4})')
+
+# Headers used to request reddit's .json pages, so they look like they come from a browser.
+_REDDIT_HEADERS = {
+    'authority': 'www.reddit.com',
+    'sec-ch-ua': '"Chromium";v="94", "Google Chrome";v="94", ";Not A Brand";v="99"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'dnt': '1',
+    'upgrade-insecure-requests': '1',
+    'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.71 Safari/537.36',
+    'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9',
+    'sec-fetch-site': 'none',
+    'sec-fetch-mode': 'navigate',
+    'sec-fetch-user': '?1',
+    'sec-fetch-dest': 'document',
+    'accept-language': 'en,es-ES;q=0.9,es;q=0.8',
+}
+
+# Size of the pieces in which videos are read while downloading,
+# and how much of them is gathered before writing it to disk.
+CHUNK_SIZE = 64 * 1024
+WRITE_BATCH_SIZE = 2 * 1024 * 1024
+
+
+def _blocking_write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _remove_files(*paths):
+    for path in paths:
+        pathlib.Path(path).unlink(missing_ok=True)
+
+
+def _clean_up_reddit_video(video_file, audio_file, dst_file, muxed):
+    """ Move the video into place if it couldn't be joined with its audio and delete the temporary files """
+    if not muxed:
+        # Video probably has no audio, so the temporary video is already the final file.
+        os.replace(video_file, dst_file)
+
+    # Delete temporary files.
+    _remove_files(video_file, audio_file)
+
 
 class SubredditDownloader:
     def __init__(self):
@@ -24,44 +78,70 @@ class SubredditDownloader:
         self.config = ConfigParser()
         self.config.read('config.ini')
         self.bot_config = self.config['BOT']
+        self._dirs = self.make_dst_folders()
 
         # Turn off warnings.
         warnings.filterwarnings('ignore')
 
         self.api = PushshiftAPI()
+        self.connections = {'created': 0, 'reused': 0}
         self.session = self.set_session()
 
-    @staticmethod
-    def set_session():
+        # Limit how many downloads/lookups are running at the same time. It's enforced by schedule().
+        self.max_concurrent = self.bot_config.getint('MAX_CONCURRENT', 32)
+        self.ffmpeg_sem = asyncio.Semaphore(os.cpu_count() or 1)
+        # Reddit rate limits its .json pages quickly, so only a few are requested at the same time.
+        self.json_sem = asyncio.Semaphore(4)
+
+    def set_session(self):
         # Some image hosts (ahyes.fun) were throwing ssl errors, so we stop verifying certificates.
-        conn = aiohttp.TCPConnector(limit=10, ssl=False)
+        # Most requests go to a handful of hosts (i.redd.it, v.redd.it, imgur), so we keep
+        # idle connections alive between downloads and cache their DNS lookups.
+        conn = aiohttp.TCPConnector(limit=self.bot_config.getint('CONN_LIMIT', 100),
+                                    limit_per_host=self.bot_config.getint('CONN_PER_HOST', 20),
+                                    ssl=False,
+                                    ttl_dns_cache=300,
+                                    use_dns_cache=True,
+                                    keepalive_timeout=120,
+                                    force_close=False,
+                                    enable_cleanup_closed=True)
 
         # If the subreddit is big, it could take a long time to download everything
         # and sooner or later the session expires, so we'll just disable timeouts.
         timeout = aiohttp.ClientTimeout(total=None)
 
-        return aiohttp.ClientSession(connector=conn, timeout=timeout)
+        # Keep count of how many connections get reused, to check keepalive is doing its job.
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self.on_connection_created)
+        trace_config.on_connection_reuseconn.append(self.on_connection_reused)
 
-    async def run(self):
-        # Get the total amount of submissions to download, this allows us to set the progressbar.
-        try:
-            total_submissions = await self.get_submissions_amount()
-        except RuntimeError:
-            print("No images found. Quitting...")
-            return
+        return aiohttp.ClientSession(connector=conn, timeout=timeout, trace_configs=[trace_config])
+
+    async def on_connection_created(self, session, trace_config_ctx, params):
+        self.connections['created'] += 1
 
+    async def on_connection_reused(self, session, trace_config_ctx, params):
+        self.connections['reused'] += 1
+
+    async def run(self):
         submissions = await self.get_submissions()
+
         print("\nSearching posts...", flush=True)
-        elements = await self.get_elements_info(submissions, total_submissions)
+        elements = await self.get_elements_info(submissions)
+        if not elements:
+            print("No images found. Quitting...")
+            return
 
         print("\nDownloading posts...", flush=True)
         await self.download_elements(elements)
 
+        self.log.debug(f"Connections created: {self.connections['created']}, "
+                       f"reused: {self.connections['reused']}")
+
     async def download_elements(self, links: dict):
-        pattern = r'\.(jpe?g|gif?v|png|mp4)'
-        tasks = []
+        downloads = []
         for name, link in links.items():
-            match = re.search(pattern, link)
+            match = _EXT_RE.search(link)
             # Add the proper extension (png|jpg|mp4|gif) to the name.
             try:
                 name += '.' + match.group(1)
@@ -74,36 +154,37 @@ class SubredditDownloader:
                     print(f"Unrecognized link skipped. {link}")
                     continue
 
-            tasks.append(asyncio.create_task(self.download(name=name, url=link)))
+            downloads.append((name, link))
 
-        await async_tqdm.gather(*tasks, colour='green')
+        # Only schedule a new download when a slot frees up, instead of creating
+        # a task for every link at once, which eats a lot of memory on big subreddits.
+        pending = set()
+        with async_tqdm(total=len(downloads), colour='green', mininterval=0.5) as pbar:
+            for name, link in downloads:
+                done = await self.schedule(pending, self.download(name=name, url=link))
+                for task in done:
+                    task.result()
+                pbar.update(len(done))
 
-    async def get_submissions_amount(self):
-        """ Get the total number of submissions """
-        submissions = await self.get_submissions(ask_len=True)
-        next(submissions)
-        return self.api.metadata_['es']['hits']['total']['value']
+            for task in asyncio.as_completed(pending):
+                await task
+                pbar.update(1)
 
-    async def get_submissions(self, ask_len=False):
+    async def get_submissions(self):
         subreddit = self.bot_config['SUBREDDIT']
-        # If we only want to know the total amount of submissions,
-        # we can set a limit of 1 to be kind to PushShift api.
-        limit = 1 if ask_len else None
 
         date_config = self.config['DATES']
         before = date_config['BEFORE'] or ''
         after = date_config['AFTER'] or ''
 
-        if ask_len:
-            subreddit = self.bot_config['SUBREDDIT']
-            if after and before:
-                print(f"Scraping images from r/{subreddit} before {before} and after {after}")
-            elif before:
-                print(f"Scraping images from r/{subreddit} before {before}")
-            elif after:
-                print(f"Scraping images from r/{subreddit} after {after}")
-            else:
-                print(f"Scraping all images from r/{subreddit} ")
+        if after and before:
+            print(f"Scraping images from r/{subreddit} before {before} and after {after}")
+        elif before:
+            print(f"Scraping images from r/{subreddit} before {before}")
+        elif after:
+            print(f"Scraping images from r/{subreddit} after {after}")
+        else:
+            print(f"Scraping all images from r/{subreddit} ")
 
         try:
             if before:
@@ -116,8 +197,7 @@ class SubredditDownloader:
             await self.session.close()
             exit()
 
-        return self.api.search_submissions(limit=limit,
-                                           subreddit=subreddit,
+        return self.api.search_submissions(subreddit=subreddit,
                                            before=before,
                                            after=after,
                                            fields=['id',
@@ -128,55 +208,117 @@ class SubredditDownloader:
                                                    'permalink']
                                            )
 
-    async def get_elements_info(self, submissions, submissions_len) -> dict:
+    @staticmethod
+    async def stream_submissions(submissions):
+        """ Yield submissions as PushShift returns them, fetching its pages in another thread """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        # Lets the thread know it has to stop, otherwise it'd keep fetching pages after
+        # we're done (cancelled, or an error), and the program would hang until it finished.
+        stop = threading.Event()
+
+        def fetch():
+            # PushShift is queried page by page while iterating, which would block the event loop.
+            try:
+                for sub in submissions:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, sub)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        fetcher = asyncio.ensure_future(asyncio.to_thread(fetch))
+        try:
+            while (sub := await queue.get()) is not None:
+                yield sub
+        finally:
+            stop.set()
+
+        await fetcher
+
+    async def get_elements_info(self, submissions) -> dict:
         elements = {}
+        # Gifs and videos need an extra request to find their real link,
+        # so we start resolving them while the rest of the submissions are still being fetched.
+        resolvers = {'gifv': self.get_real_gif_link, 'video': self.parse_video}
+        lookups = set()
+        links = []
+
+        async def resolve(sub_id, coro):
+            link = await coro
+            pbar.update(1)
+            return sub_id, link
+
+        # Only redraw the progress bar every so often, since there can be a lot of submissions.
+        with tqdm(colour='green', mininterval=0.5, miniters=100) as pbar:
+            async with contextlib.aclosing(self.stream_submissions(submissions)) as stream:
+                async for sub in stream:
+                    if pbar.total is None:
+                        # The total amount is known once PushShift returned its first page.
+                        pbar.total = self.api.metadata_['es']['hits']['total']['value']
+                        pbar.refresh()
+
+                    url = getattr(sub, 'url', None)
+                    if url is None:
+                        # Update progress bar status
+                        pbar.update(1)
+                        continue
+
+                    sid = sub.id
+                    kind = None
+                    if url.endswith(('.jpg', '.gif', '.png')):
+                        elements[sid] = url
+                    elif url.endswith('.gifv'):
+                        kind = 'gifv'
+                    elif url.startswith('https://www.reddit.com/gallery/'):
+                        try:
+                            elements.update(await self.parse_image(sid, sub.media_metadata))
+                        except AttributeError:
+                            # This happens with removed posts.
+                            pass
+                    elif url.startswith('https://v.redd.it/'):
+                        kind = 'video'
+                    else:
+                        # External link. Ignore it.
+                        pass
 
-        with tqdm(total=submissions_len, colour='green') as pbar:
-            for sub in submissions:
-                if not hasattr(sub, 'url'):
+                    if kind:
+                        done = await self.schedule(lookups, resolve(sid, resolvers[kind](sub)))
+                        links.extend(task.result() for task in done)
+                        continue
                     # Update progress bar status
                     pbar.update(1)
-                    continue
-                if re.search(r'\.(jpg|gif|png)$', sub.url):
-                    elements[sub.id] = sub.url
-                elif re.search(r'\.gifv$', sub.url):
-                    link = await self.get_real_gif_link(sub.url)
-                    if link:
-                        elements[sub.id] = link
-                elif sub.url.startswith('https://www.reddit.com/gallery/'):
-                    try:
-                        images = await self.parse_image(sub.id, sub.media_metadata)
-                        for key, value in images.items():
-                            elements[key] = value
-                    except AttributeError:
-                        # This happens with removed posts.
-                        pass
 
-                elif sub.url.startswith('https://v.redd.it/'):
-                    video = await self.parse_video(sub)
-                    if video:
-                        elements[sub.id] = video
-                else:
-                    # External link. Ignore it.
-                    pass
-                # Update progress bar status
-                pbar.update(1)
+            if lookups:
+                done, _ = await asyncio.wait(lookups)
+                links.extend(task.result() for task in done)
+
+        for sub_id, link in links:
+            if link:
+                elements[sub_id] = link
+
         return elements
 
-    async def get_real_gif_link(self, link):
+    async def schedule(self, pending: set, coro) -> set:
+        """ Start coro once there are less than max_concurrent pending tasks. Returns the tasks that finished """
+        done = set()
+        if len(pending) >= self.max_concurrent:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending -= done
+
+        pending.add(asyncio.create_task(coro))
+        return done
+
+    @retry_connection
+    async def get_real_gif_link(self, submission):
         # Imgur does a very strange thing where their .gifv are actually just .mp4,
         # so we need the real link to the video.
-        async with self.session.get(link) as resp:
+        async with self.session.get(submission.url) as resp:
             data = await resp.read()
-            # Convert bytes to str.
-            try:
-                data = data.decode('utf-8')
-                match = re.findall(r'content="(.+mp4)', data)
-            except UnicodeDecodeError:
-                print(f"Wrong encoding format for {link}. Skipped.")
-                return ''
 
-        return '' if not match else match[0]
+        # Search the raw bytes, so pages with a weird encoding don't need to be decoded.
+        match = _MP4_META_RE.search(data)
+        return match.group(1).decode('ascii', 'replace') if match else ''
 
     @retry_connection
     async def download(self, name, url) -> None:
@@ -188,78 +330,122 @@ class SubredditDownloader:
                 # And here: https://v.redd.it/stx7a2b1ofr71/DASH_720.mp4?source=fallback
                 return
 
-            content = await response.read()
-
             if url.startswith('https://v.redd.it'):
-                await self.download_reddit_video(name, url, video_data=content)
+                await self.download_reddit_video(name, url, video_response=response)
             else:
-                await self.write_to_disk(name=name, image=content)
-
-    async def download_reddit_video(self, name, url, video_data):
-        # Download video's audio.
-        audio_link = re.sub(r'DASH_(\d{3,4})', 'DASH_audio', url)
-        async with self.session.get(audio_link) as audio_response:
-            audio_data = await audio_response.read()
-
-        # Store them into files.
-        temp_video_file = f'{name}_temp.mp4'
-        temp_audio_file = f'{name}_audio_temp.mp4'
-        async with aiofiles.open(temp_video_file, 'wb') as file:
-            await file.write(video_data)
-
-        async with aiofiles.open(temp_audio_file, 'wb') as file:
-            await file.write(audio_data)
-
-        # Load them into ffmpeg and join them.
-        input_video = ffmpeg.input(temp_video_file)
-        input_audio = ffmpeg.input(temp_audio_file)
+                await self.write_to_disk(name=name, image=await response.read())
 
-        dir_path = await self.get_file_dst_folder(name)
+    async def download_reddit_video(self, name, url, video_response):
+        dir_path = self.get_file_dst_folder(name)
         dst_file = str(dir_path / name)
 
-        stream = ffmpeg.output(input_video,
-                               input_audio,
-                               filename=dst_file,
-                               vcodec='copy',
-                               acodec='copy',
-                               loglevel='quiet')
+        # Store video and audio into temporary files as they are downloaded. They're kept next to
+        # the final file, so moving them into place is atomic and a failed download leaves no broken video.
+        temp_video_file = str(dir_path / f'{name}.part')
+        temp_audio_file = str(dir_path / f'{name}.audio.part')
         try:
-            stream.run(overwrite_output=True)
-        except ffmpeg.Error:
-            # Video probably has no audio.
-            await self.write_to_disk(name=name, image=video_data)
+            # The video has to be read completely first: until then it holds its connection to v.redd.it,
+            # and the audio requests below could wait forever for a free one.
+            await self.stream_to_file(temp_video_file, video_response)
+
+            # Lots of videos don't have audio, so we check before downloading it.
+            # Reddit responds with 403 when there's no audio, same as with deleted videos.
+            audio_link = _AUDIO_RE.sub('DASH_audio', url)
+            async with self.session.head(audio_link, allow_redirects=True) as audio_response:
+                has_audio = audio_response.status not in (403, 404)
+
+            if not has_audio:
+                # Nothing to join, so the video is already the final file.
+                await asyncio.to_thread(os.replace, temp_video_file, dst_file)
+                return
 
-        # Delete temporary files.
-        pathlib.Path(temp_video_file).unlink()
-        pathlib.Path(temp_audio_file).unlink()
+            # Download video's audio.
+            async with self.session.get(audio_link) as audio_response:
+                await self.stream_to_file(temp_audio_file, audio_response)
+
+            # Load them into ffmpeg and join them.
+            input_video = ffmpeg.input(temp_video_file)
+            input_audio = ffmpeg.input(temp_audio_file)
+
+            stream = ffmpeg.output(input_video,
+                                   input_audio,
+                                   filename=dst_file,
+                                   vcodec='copy',
+                                   acodec='copy',
+                                   loglevel='quiet')
+
+            # Run ffmpeg without blocking the event loop, but don't run more of them than CPUs we have.
+            async with self.ffmpeg_sem:
+                process = await asyncio.create_subprocess_exec(*ffmpeg.compile(stream, overwrite_output=True),
+                                                               stdout=asyncio.subprocess.DEVNULL,
+                                                               stderr=asyncio.subprocess.DEVNULL)
+                try:
+                    return_code = await process.wait()
+                except asyncio.CancelledError:
+                    # Don't leave ffmpeg running on its own, nor the half-written video it was making.
+                    with contextlib.suppress(ProcessLookupError):
+                        process.kill()
+                    await process.wait()
+                    await asyncio.to_thread(_remove_files, dst_file)
+                    raise
+
+            await asyncio.to_thread(_clean_up_reddit_video, temp_video_file, temp_audio_file, dst_file,
+                                    muxed=return_code == 0)
+        except BaseException:
+            # Whatever went wrong (download, ffmpeg missing, cancelled...), don't leave temporary files behind.
+            await asyncio.to_thread(_remove_files, temp_video_file, temp_audio_file)
+            raise
 
     async def write_to_disk(self, name, image):
         """ Write the downloaded image/video/gif into the corresponding folder """
-        dir_path = await self.get_file_dst_folder(name)
+        dir_path = self.get_file_dst_folder(name)
 
         file_path = dir_path / name
-        f = await aiofiles.open(file_path, mode='wb')
-        await f.write(image)
-        await f.close()
-
-    async def get_file_dst_folder(self, name):
-        if name.endswith('mp4'):
-            sub_folder = 'videos'
-        elif name.endswith('gif') or name.endswith('gifv'):
-            sub_folder = 'gifs'
-        else:
-            sub_folder = 'images'
+        await asyncio.to_thread(_blocking_write, file_path, image)
 
-        dir_path = pathlib.Path(self.bot_config['DOWNLOAD_FOLDER']) / self.bot_config['SUBREDDIT'] / sub_folder
+    @staticmethod
+    async def stream_to_file(file_path, response):
+        """ Write the response body into a file as it arrives, without loading it all in memory """
+        f = await asyncio.to_thread(open, file_path, 'wb')
         try:
-            dir_path.mkdir(parents=True, exist_ok=True)
-            return dir_path
+            # Chunks are gathered into bigger batches, so each trip to a worker thread writes a few MB.
+            batch, batch_size = [], 0
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                batch.append(chunk)
+                batch_size += len(chunk)
+                if batch_size >= WRITE_BATCH_SIZE:
+                    await asyncio.to_thread(f.writelines, batch)
+                    batch, batch_size = [], 0
+
+            if batch:
+                await asyncio.to_thread(f.writelines, batch)
+        finally:
+            await asyncio.to_thread(f.close)
+
+    def make_dst_folders(self):
+        """ Create the folders where files will be downloaded, so it's done only once """
+        base_path = pathlib.Path(self.bot_config['DOWNLOAD_FOLDER']) / self.bot_config['SUBREDDIT']
+        dirs = {sub_folder: base_path / sub_folder for sub_folder in ('videos', 'gifs', 'images')}
+        try:
+            for dir_path in dirs.values():
+                dir_path.mkdir(parents=True, exist_ok=True)
         except FileNotFoundError as error:
             print(error)
             print("Is your Download folder written correctly?")
-            await self.session.close()
             exit()
 
+        return dirs
+
+    def get_file_dst_folder(self, name):
+        if name.endswith('.mp4'):
+            sub_folder = 'videos'
+        elif name.endswith(('.gif', '.gifv')):
+            sub_folder = 'gifs'
+        else:
+            sub_folder = 'images'
+
+        return self._dirs[sub_folder]
+
     @staticmethod
     async def parse_image(id_, images):
         images_dict = {}
@@ -297,52 +483,44 @@ class SubredditDownloader:
     async def download_video_with_json(self, submission) -> str:
         # The submission has not been crossposted, so to get the video information
         # we need to open the v.redd.it link, replace the end with a .json and get the video link from there.
-        headers = {
-            'authority': 'www.reddit.com',
-            'sec-ch-ua': '"Chromium";v="94", "Google Chrome";v="94", ";Not A Brand";v="99"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-platform': '"Windows"',
-            'dnt': '1',
-            'upgrade-insecure-requests': '1',
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.71 Safari/537.36',
-            'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9',
-            'sec-fetch-site': 'none',
-            'sec-fetch-mode': 'navigate',
-            'sec-fetch-user': '?1',
-            'sec-fetch-dest': 'document',
-            'accept-language': 'en,es-ES;q=0.9,es;q=0.8',
-        }
-
         link = f'https://www.reddit.com{submission.permalink}.json'
-        async with self.session.get(link, headers=headers) as response:
-            if response.status == 429:
-                print("Too many requests. Sleeping 5 minutes and trying again...")
-                for _ in trange(5 * 60):
-                    time.sleep(1)
-                return await self.download_video_with_json(submission)
+        for tries in range(1, 4):
+            async with self.json_sem, self.session.get(link, headers=_REDDIT_HEADERS) as response:
+                if response.status != 429:
+                    return await self.parse_video_json(response)
 
-            try:
-                response = await response.json()
-            except json.decoder.JSONDecodeError as error:
-                print("Error downloading video...")
-                print(f"{type(error).__name__}: {error}")
+            if tries == 3:
+                print(f"Too many requests. Video will be skipped: {submission.id}")
                 return ''
 
-            try:
-                media = response[0]['data']['children'][0]['data']['secure_media']
-                if not media:
-                    # Video was probably removed before the video was transcoded.
-                    return ''
+            # Sleep without holding a slot, so other posts can still be looked up.
+            print("Too many requests. Sleeping 5 minutes and trying again...")
+            await asyncio.sleep(5 * 60)
 
-                video = media['reddit_video']
-                if video['transcoding_status'] != 'completed':
-                    # Video didn't transcode correctly?
-                    return ''
+    @staticmethod
+    async def parse_video_json(response) -> str:
+        try:
+            data = await response.json()
+        except json.decoder.JSONDecodeError as error:
+            print("Error downloading video...")
+            print(f"{type(error).__name__}: {error}")
+            return ''
+
+        try:
+            media = data[0]['data']['children'][0]['data']['secure_media']
+            if not media:
+                # Video was probably removed before the video was transcoded.
+                return ''
 
-                return video['fallback_url']
-            except TypeError as error:
-                print("Error downloading video...")
-                print(f"{type(error).__name__}: {error}")
+            video = media['reddit_video']
+            if video['transcoding_status'] != 'completed':
+                # Video didn't transcode correctly?
+                return ''
+
+            return video['fallback_url']
+        except TypeError as error:
+            print("Error downloading video...")
+            print(f"{type(error).__name__}: {error}")
 
 
 async def main():
@@ -363,4 +541,6 @@ async def main():
 
 
 if __name__ == '__main__':
+    if uvloop:
+        uvloop.install()
     asyncio.run(main())
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import logging
 
 import requests
@@ -7,6 +8,10 @@ from aiohttp import client_exceptions
 
 def get_logger(name, logger_level=logging.INFO):
     logger = logging.getLogger(name)
+    if logger.handlers:
+        # Logger was already set up, don't attach its handlers again.
+        return logger
+
     formatter = logging.Formatter('%(asctime)s,%(msecs)d -> %(filename)s:%(lineno)d [%(levelname)s] -> %(message)s')
 
     # Log to sysout.
@@ -34,6 +39,7 @@ def _get_post_id(args, kwargs):
 def retry_connection(func):
     logger = get_logger(__name__, logging.INFO)
 
+    @functools.wraps(func)
     async def wrapper(*args, **kwargs):
         post_id = _get_post_id(args, kwargs)
 
@@ -48,6 +54,7 @@ def retry_connection(func):
 
                 if tries < 5:
                     logger.debug(f"Try {tries}/5. Retrying in 10 seconds...")
+                    await asyncio.sleep(10)
                 else:
                     # If we got to this point, we've tried 5 times without succeeding.
                     logger.error(f"Too many retries. Post will be skipped: {post_id}")